@@ -1,15 +1,15 @@
 import streamlit as st
-import pandas as pd
 from PIL import Image
-from data.data_loader import load_data
+from data.data_loader import invalidate_snapshot
+from data.master import get_master
+from data.master import get_filter_index
+from data.master import clear_master
 from utils.styling import apply_global_styles
-from utils.filters import get_filtered_df
 from utils.filters import render_persistent_filters
-from utils.display import apply_display_toggle
-from utils.helpers import school_year
-from utils.helpers import calculate_age
+from utils.filters import normalize_filters
+from utils.filters import get_filtered_index
+from utils.display import render_display_toggle
 from utils.state import init_session_state
-from streamlit import cache_data
 
 st.set_page_config(page_title="Dance Filters", layout="wide")
 apply_global_styles()
@@ -24,33 +24,15 @@ with col1:
 with col2:
     st.markdown("## Dance To EvOLvE Filters")
 
-# Cached data load
-@st.cache_data
-def get_data():
-    return load_data()
+# Sync the local snapshot with the sheet on the next load (only new rows are fetched)
+if st.button("⟳ Refresh Data"):
+    invalidate_snapshot()
+    clear_master()
 
-# Load and process data
-df = get_data()
-df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
-df['Session'] = pd.to_numeric(df['Session'], errors='coerce').fillna(0).astype(int)
-df['Season'] = df['Season'].astype(str).str.title().str.strip()
-
-
-df = school_year(df)
-
-df = calculate_age(df)
-
-#st.write(df)
-
-# Format Data
-df['School Year'] = df['School Year'].fillna(0).astype(int)
-df['Session'] = pd.to_numeric(df['Session'], errors='coerce').fillna(0).astype(int)
-df['Season'] = df['Season'].astype(str)
-df['Phone'] = df['Phone'].astype(str).replace('nan', '')  # Convert to string, replace NaN with empty string
-season_order = {'Fall': 1, 'Winter': 2, 'Spring': 3, 'Summer': 4, 'Camp': 5}
-df['Season_Order'] = df['Season'].map(season_order)
-df['Sort_Key'] = df['School Year'] * 100 + df['Season_Order'] * 10 + df['Session']
-df['Year_Season_Session'] = df['School Year String'] + ' ' + df['Season'] + ' ' + df['Session'].astype(str)
+# Shared, read-only master frame and its filter bitmaps (loaded once per process).
+# The version is read first: if the data is reloaded in between, the stored index is recomputed on use.
+df, data_version = get_master()
+filter_index = get_filter_index()
 
 # Initialize reset/select-all flags if not present
 if "reset_filters" not in st.session_state:
@@ -68,19 +50,17 @@ with col2:
         st.session_state.select_all_filters = True
 
 # Display toggle
-df, display_toggle = apply_display_toggle(df)
+display_toggle = render_display_toggle()
 
 # Render persistent filters
-selected_filters = render_persistent_filters(df)
+selected_filters = render_persistent_filters(filter_index)
 
 # Clear flags after use
 st.session_state["reset_filters"] = False
 st.session_state["select_all_filters"] = False
 
 
-# Apply filters to DataFrame
-filtered_df = get_filtered_df(df, selected_filters)
-
-st.session_state['filtered_df'] = filtered_df
+# Apply filters: the session only keeps the selected row index (and the data version it belongs to), not a copy of the data
+st.session_state['filtered_index'] = (data_version, get_filtered_index(filter_index, data_version, normalize_filters(selected_filters)))
 #st.write("Session State Snapshot:", st.session_state)
 
@@ -1,42 +1,40 @@
 import streamlit as st
 import os
 import toml
-import json
+
+# Fields of a Google service-account key
+SERVICE_ACCOUNT_FIELDS = [
+    "type", "project_id", "private_key_id", "private_key", "client_email", "client_id",
+    "auth_uri", "token_uri", "auth_provider_x509_cert_url", "client_x509_cert_url"
+]
+
+
+def service_account_info(section):
+    """Service-account dict from a secrets section, with escaped newlines in the private key restored."""
+    info = {field: section[field] for field in SERVICE_ACCOUNT_FIELDS}
+    info["private_key"] = info["private_key"].replace("\\n", "\n")
+    return info
+
+
+def streamlit_secrets():
+    """st.secrets, or an empty dict when there is no Streamlit secrets file (st.secrets raises then)."""
+    return st.secrets if st.secrets.load_if_toml_exists() else {}
 
 
 def get_google_credentials():
     """
     Return Google credentials from Streamlit secrets (TOML) or a local TOML fallback.
+    The secrets may hold the key at the top level or under [google_credentials];
+    the local file (LOCAL_TOML_PATH, default secrets.toml) must use [google_credentials].
     """
-    if hasattr(st, "secrets") and "type" in st.secrets:
-        return {
-            "type": st.secrets["type"],
-            "project_id": st.secrets["project_id"],
-            "private_key_id": st.secrets["private_key_id"],
-            "private_key": st.secrets["private_key"].replace("\\n", "\n"),
-            "client_email": st.secrets["client_email"],
-            "client_id": st.secrets["client_id"],
-            "auth_uri": st.secrets["auth_uri"],
-            "token_uri": st.secrets["token_uri"],
-            "auth_provider_x509_cert_url": st.secrets["auth_provider_x509_cert_url"],
-            "client_x509_cert_url": st.secrets["client_x509_cert_url"]
-        }
-    else:
-        # For local dev: load from a TOML file like secrets.toml
-        toml_path = os.getenv("LOCAL_TOML_PATH", "secrets.toml")
-        with open(toml_path, "r") as f:
-            secrets = toml.load(f)
-            google = secrets.get("google_credentials", {})
-
-        return {
-            "type": google["type"],
-            "project_id": google["project_id"],
-            "private_key_id": google["private_key_id"],
-            "private_key": google["private_key"].replace("\\n", "\n"),
-            "client_email": google["client_email"],
-            "client_id": google["client_id"],
-            "auth_uri": google["auth_uri"],
-            "token_uri": google["token_uri"],
-            "auth_provider_x509_cert_url": google["auth_provider_x509_cert_url"],
-            "client_x509_cert_url": google["client_x509_cert_url"]
-        }
+    secrets = streamlit_secrets()
+    if "google_credentials" in secrets:
+        return service_account_info(secrets["google_credentials"])
+    if "type" in secrets:
+        return service_account_info(secrets)
+
+    # For local dev: load from a TOML file like secrets.toml
+    toml_path = os.getenv("LOCAL_TOML_PATH", "secrets.toml")
+    with open(toml_path, "r") as f:
+        secrets = toml.load(f)
+    return service_account_info(secrets.get("google_credentials", {}))
@@ -1,66 +1,211 @@
 import os
-import streamlit as st
-import toml
+import time
+import hashlib
 import json
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
+from gspread.exceptions import APIError
+from google.auth.exceptions import GoogleAuthError
+from gspread.utils import rowcol_to_a1
+from data.sheets_client import get_worksheet
+from data.sheets_client import reset_client
 
+# Local columnar snapshot of the "Data" worksheet
+SNAPSHOT_PATH = os.getenv("DATA_SNAPSHOT_PATH", os.path.join("data", "cache", "data_snapshot.parquet"))
+SNAPSHOT_META_PATH = os.path.splitext(SNAPSHOT_PATH)[0] + ".json"
+SNAPSHOT_MAX_AGE = int(os.getenv("DATA_SNAPSHOT_MAX_AGE", 15 * 60))  # seconds
+SNAPSHOT_FULL_SYNC_AGE = int(os.getenv("DATA_SNAPSHOT_FULL_SYNC_AGE", 24 * 60 * 60))  # seconds
 
-def load_credentials():
+# Declared types of the "Data" worksheet columns. Every other column is kept as text ("" when blank),
+# including all-digit ones such as Time, Class or Phone that get_all_records used to turn into ints
+SHEET_NUMERIC_COLUMNS = ["Year", "Age"]  # blank or invalid cells become NaN
+SHEET_INTEGER_COLUMNS = ["Session"]      # blank or invalid cells become 0
+SHEET_TITLE_CASE_COLUMNS = ["Season"]    # e.g. " fall" -> "Fall"
+SHEET_SCHEMA_VERSION = 1
+
+
+def open_worksheet():
+    """The "Data" worksheet on the process-wide authorized client."""
+    return get_worksheet()
+
+
+def row_fingerprint(values):
+    return [str(v) for v in values]
+
+
+def apply_sheet_schema(df):
     """
-    Load credentials from Streamlit secrets or local TOML file.
-    Streamlit's secrets file and local file must match in structure.
+    Coerce the sheet's columns to their declared types (see SHEET_NUMERIC_COLUMNS and below),
+    so nothing downstream has to re-parse them. Also upgrades snapshots written before the schema.
+    Undeclared columns become text cell by cell, so e.g. Phone keeps its leading zeros.
     """
-    if hasattr(st, "secrets") and "google_credentials" in st.secrets:
-        google = st.secrets["google_credentials"]
-        return {
-            "type": google["type"],
-            "project_id": google["project_id"],
-            "private_key_id": google["private_key_id"],
-            "private_key": google["private_key"].replace("\\n", "\n"),
-            "client_email": google["client_email"],
-            "client_id": google["client_id"],
-            "auth_uri": google["auth_uri"],
-            "token_uri": google["token_uri"],
-            "auth_provider_x509_cert_url": google["auth_provider_x509_cert_url"],
-            "client_x509_cert_url": google["client_x509_cert_url"]
-        }
-    else:
-        # Local development: load from secrets.toml
-        toml_path = os.getenv("LOCAL_TOML_PATH", "secrets.toml")
-        with open(toml_path, "r") as f:
-            toml_data = toml.load(f)
-            gcreds = toml_data.get("google_credentials", {})
-
-        return {
-            "type": gcreds["type"],
-            "project_id": gcreds["project_id"],
-            "private_key_id": gcreds["private_key_id"],
-            "private_key": gcreds["private_key"].replace("\\n", "\n"),
-            "client_email": gcreds["client_email"],
-            "client_id": gcreds["client_id"],
-            "auth_uri": gcreds["auth_uri"],
-            "token_uri": gcreds["token_uri"],
-            "auth_provider_x509_cert_url": gcreds["auth_provider_x509_cert_url"],
-            "client_x509_cert_url": gcreds["client_x509_cert_url"]
-        }
+    df = df.copy()
+    for col in df.columns:
+        if col in SHEET_NUMERIC_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        elif col in SHEET_INTEGER_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
+        else:
+            df[col] = df[col].astype(str)
+            if col in SHEET_TITLE_CASE_COLUMNS:
+                df[col] = df[col].str.title().str.strip()
+    return df
 
 
-def load_data():
-    scope = [
-        "https://spreadsheets.google.com/feeds",
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive.file",
-        "https://www.googleapis.com/auth/drive",
-    ]
-    creds_dict = load_credentials()
-    creds = Credentials.from_service_account_info(creds_dict, scopes=scope)
-    client = gspread.authorize(creds)
-
-    # Load worksheet
-    sheet = client.open("DanceToEvolve_Data").worksheet("Data")
-    records = sheet.get_all_records()
-    return pd.DataFrame(records)
+def build_sheet_frame(header, rows):
+    """Typed frame from raw worksheet values (one list of cell strings per row, header excluded)."""
+    rows = [row + [""] * (len(header) - len(row)) for row in rows]
+    return apply_sheet_schema(pd.DataFrame(rows, columns=header))
+
+
+def fetch_sheet_data(sheet):
+    """
+    Pull the full worksheet as one 2-D list of cell values and type it with the declared schema.
+    Returns the frame plus the sync state (header, row count, last row) used for later delta syncs.
+    """
+    values = sheet.get_values()
+    header = values[0] if values else sheet.row_values(1)
+    rows = values[1:]
+    last_row = row_fingerprint(rows[-1] if rows else header)
+    sync_state = {"header": header, "row_count": len(rows), "last_row": last_row}
+    return build_sheet_frame(header, rows), sync_state
+
+
+def fetch_sheet_delta(sheet, meta):
+    """
+    Pull only the rows appended since the last sync.
+    Returns None when the synced part of the sheet no longer matches the snapshot
+    (header changed, rows removed or the last synced row edited) and a full reload is needed.
+    """
+    header = meta.get("header")
+    row_count = meta.get("row_count")
+    if not header or row_count is None or sheet.row_values(1) != header:
+        return None
+
+    # Start at the last synced row (the header when nothing was synced) so it can be checked
+    last_col = rowcol_to_a1(1, len(header))[:-1]
+    values = sheet.get_values(f"A{row_count + 1}:{last_col}")
+    if not values:
+        return None
+
+    rows = [row + [""] * (len(header) - len(row)) for row in values]
+    if row_fingerprint(rows[0]) != meta["last_row"]:
+        return None
+
+    new_rows = rows[1:]
+    sync_state = {
+        "header": header,
+        "row_count": row_count + len(new_rows),
+        "last_row": row_fingerprint(rows[-1]),
+    }
+    return build_sheet_frame(header, new_rows), sync_state
+
+
+def data_version(df):
+    """Short content hash of the loaded frame, used as the cache key for everything derived from it."""
+    digest = hashlib.md5(",".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
 
+def read_snapshot_meta():
+    try:
+        with open(SNAPSHOT_META_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
+
+def read_snapshot():
+    """Return (DataFrame, metadata) from the local snapshot, or (None, None) if there is none."""
+    meta = read_snapshot_meta()
+    if meta is None or not os.path.exists(SNAPSHOT_PATH):
+        return None, None
+    try:
+        return pd.read_parquet(SNAPSHOT_PATH), meta
+    except (OSError, ValueError):
+        # Unreadable or half-written snapshot: treat as missing
+        return None, None
+
+
+def write_snapshot_meta(meta):
+    with open(SNAPSHOT_META_PATH + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(SNAPSHOT_META_PATH + ".tmp", SNAPSHOT_META_PATH)
+
+
+def write_snapshot(df, **meta):
+    """Persist the frame as Parquet plus a small JSON sidecar, replacing any previous snapshot."""
+    os.makedirs(os.path.dirname(SNAPSHOT_PATH) or ".", exist_ok=True)
+    meta = {"synced_at": time.time(), "stale": False, **meta}
+    if "version" not in meta:
+        meta["version"] = data_version(df)
+    df.to_parquet(SNAPSHOT_PATH + ".tmp", index=False)
+    os.replace(SNAPSHOT_PATH + ".tmp", SNAPSHOT_PATH)
+    write_snapshot_meta(meta)
+
+
+def invalidate_snapshot():
+    """Mark the snapshot stale so the next load syncs with the sheet."""
+    meta = read_snapshot_meta()
+    if meta is None:
+        return
+    meta["stale"] = True
+    write_snapshot_meta(meta)
+
+
+def snapshot_is_fresh(meta):
+    return not meta.get("stale", False) and time.time() - meta.get("synced_at", 0) < SNAPSHOT_MAX_AGE
+
+
+def needs_full_sync(meta):
+    return time.time() - meta.get("full_synced_at", 0) >= SNAPSHOT_FULL_SYNC_AGE
+
+
+def load_versioned_data():
+    """
+    Load the "Data" worksheet, serving it from the local snapshot while it is fresh.
+    A stale snapshot is brought up to date by fetching only the appended rows; the
+    whole sheet is re-downloaded when the delta cannot be applied, or
+    once the last full sync is older than SNAPSHOT_FULL_SYNC_AGE.
+    Falls back to a stale snapshot if the Sheets API cannot be reached or the credentials fail.
+    Returns (DataFrame, data version); the version only changes when the data does.
+    """
+    df, meta = read_snapshot()
+    if df is not None and meta.get("schema") != SHEET_SCHEMA_VERSION:
+        # Snapshot written before the declared schema: type it once and rewrite it
+        df = apply_sheet_schema(df)
+        meta = {**meta, "schema": SHEET_SCHEMA_VERSION, "version": data_version(df)}
+        write_snapshot(df, **meta)
+    if df is not None and snapshot_is_fresh(meta):
+        return df, meta["version"]
+
+    try:
+        sheet = open_worksheet()
+        delta = None
+        if df is not None and not needs_full_sync(meta):
+            delta = fetch_sheet_delta(sheet, meta)
+
+        if delta is not None:
+            new_rows, sync_state = delta
+            full_synced_at = meta.get("full_synced_at", 0)
+            fetched = pd.concat([df, new_rows], ignore_index=True)
+        else:
+            new_rows, sync_state = fetch_sheet_data(sheet)
+            full_synced_at = time.time()
+            fetched = new_rows
+    except (APIError, GoogleAuthError, OSError) as e:
+        if isinstance(e, GoogleAuthError):
+            # Expired or revoked credentials: authorize a new client on the next load
+            reset_client()
+        if df is not None:
+            return df, meta["version"]
+        raise
+
+    version = data_version(fetched)
+    write_snapshot(fetched, full_synced_at=full_synced_at, version=version, schema=SHEET_SCHEMA_VERSION, **sync_state)
+    return fetched, version
+
+
+def load_data():
+    """Load the "Data" worksheet (see load_versioned_data) without its version."""
+    return load_versioned_data()[0]
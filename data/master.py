@@ -0,0 +1,89 @@
+import streamlit as st
+from data.data_loader import load_versioned_data
+from data.data_loader import SNAPSHOT_MAX_AGE
+from utils.helpers import compute_school_year
+from utils.helpers import compute_age
+from utils.helpers import compact_dtypes
+from utils.acquisition import compute_acquisition_flags
+from utils.display import add_display_columns
+from utils.filters import FilterIndex
+
+
+def prepare_master_df(df):
+    """
+    Derive school years, ages, sort keys and new-student flags for the loaded sheet.
+    Year, Session, Season and Phone already have their declared types (see data_loader.apply_sheet_schema).
+    """
+    df = compute_school_year(df)
+
+    df = compute_age(df)
+
+    # Format Data
+    df['School Year'] = df['School Year'].fillna(0).astype(int)
+    season_order = {'Fall': 1, 'Winter': 2, 'Spring': 3, 'Summer': 4, 'Camp': 5}
+    df['Season_Order'] = df['Season'].map(season_order)
+    df['Sort_Key'] = df['School Year'] * 100 + df['Season_Order'] * 10 + df['Session']
+    df['Year_Season_Session'] = df['School Year String'] + ' ' + df['Season'] + ' ' + df['Session'].astype(str)
+
+    # x-axis label, sort key and session index for every display mode
+    df = add_display_columns(df)
+
+    # New-student flags for every display mode, computed once over the full history
+    df = compute_acquisition_flags(df)
+
+    # Categoricals and small ints to keep the shared frame small
+    return compact_dtypes(df)
+
+
+@st.cache_resource(ttl=SNAPSHOT_MAX_AGE)
+def _load_master():
+    """
+    Reload at most every SNAPSHOT_MAX_AGE seconds, so a stale snapshot goes through the sync path
+    in a running server too. The frame is only prepared again when the data version changes.
+    """
+    df, version = load_versioned_data()
+    return _prepare_master(df, version), version
+
+
+@st.cache_resource(max_entries=1)
+def _prepare_master(_df, data_version):
+    return prepare_master_df(_df)
+
+
+def get_master():
+    """(master frame, data version), read together so they always belong to the same load."""
+    return _load_master()
+
+
+def get_master_df():
+    """
+    The prepared master DataFrame, loaded once per process and shared by every session.
+    Treat it as read-only: sessions keep only their filter selections and row index.
+    """
+    return _load_master()[0]
+
+
+def get_data_version():
+    """
+    Version token of the loaded data. Caches of frames derived from the master frame
+    key on it (with the frame passed as an unhashed _df argument) instead of hashing the frame.
+    """
+    return _load_master()[1]
+
+
+def get_filter_index():
+    """Per-value row bitmaps over the shared master frame."""
+    df, version = get_master()
+    return _build_filter_index(df, version)
+
+
+@st.cache_resource(max_entries=1)
+def _build_filter_index(_df, data_version):
+    return FilterIndex(_df)
+
+
+def clear_master():
+    """Drop the shared master frame and everything derived from it."""
+    _load_master.clear()
+    _prepare_master.clear()
+    _build_filter_index.clear()
@@ -0,0 +1,233 @@
+import io
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import openpyxl
+from gspread.exceptions import APIError
+from data.data_loader import open_worksheet
+from data.data_loader import invalidate_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def extract_info_from_filename(filename):
+    file_name = os.path.basename(filename)
+    parts = os.path.splitext(file_name)[0].split('_')
+
+    # Ensure the parts list has at least 9 elements, filling missing values with "N/A"
+    while len(parts) < 9:
+        parts.append("N/A")
+
+    return {
+        "Location": parts[0],
+        "Reg/NonReg": parts[1],
+        "Season": parts[2],
+        "Session": parts[3],
+        "Year": parts[4],
+        "Class": parts[5],
+        "Teacher": parts[6],
+        "Day": parts[7],  # This will be "N/A" if missing
+        "Time": parts[8], # This will be "N/A" if missing
+        "Source": file_name
+    }
+
+
+# Birth dates are stored as e.g. "Jan 05, 2012"; unparseable ones default to Jan 1, 2000
+BIRTH_DATE_FORMAT = '%b %d, %Y'
+DEFAULT_BIRTH_DATE = pd.Timestamp(2000, 1, 1)
+
+
+def clean_last_names(last_names):
+    """Drop parenthesized notes such as "Smith (Mom)" from a column of last names."""
+    return last_names.str.replace(r"\s?\(.*\)", "", regex=True)
+
+
+def normalize_roster(df, filename):
+    """
+    Turn one class roster into rows of the "Data" worksheet, column by column:
+    cleaned last names, birth dates parsed in bulk, DancerIDs, and the metadata
+    in the filename broadcast to every row.
+    """
+    info = extract_info_from_filename(filename)
+
+    session = int(info["Session"]) if info["Session"].isdigit() else None
+    year = int(info["Year"]) if info["Year"].isdigit() else None
+
+    last_name = clean_last_names(df['Last Name'])
+
+    # Non-text cells (blank, numbers, Excel dates) fail the format and get the default too
+    birth_date = pd.to_datetime(df['Birth Date'].astype(str), format=BIRTH_DATE_FORMAT, errors='coerce')
+    invalid = birth_date.isna()
+    if invalid.any():
+        logger.warning("Error parsing %d birth date(s) in %s; using %s", invalid.sum(), filename, DEFAULT_BIRTH_DATE.strftime(BIRTH_DATE_FORMAT))
+    birth_date = birth_date.fillna(DEFAULT_BIRTH_DATE).dt.strftime(BIRTH_DATE_FORMAT)
+
+    return pd.DataFrame({
+        "DancerID": df['First Name'].astype(str) + "_" + last_name.astype(str) + "_" + birth_date,
+        "FirstName": df['First Name'],
+        "LastName": last_name,
+        "Phone": df['Phone'],
+        "Email": df['Email'],
+        "Address": df['Address'],
+        "BirthDate": birth_date,
+        "Age": None,  # Set to "leave blank" (None in pandas)
+        "City": None,
+        "Location": info["Location"],
+        "Reg/NonReg": info["Reg/NonReg"],
+        "Season": info["Season"],
+        "Session": session,
+        "Year": year,
+        "Class": info["Class"],
+        "Teacher": info["Teacher"],
+        "Day": info["Day"],
+        "Time": info["Time"],
+        "Source": info["Source"]
+    }, index=df.index).reset_index(drop=True)
+
+
+def read_roster(filename, content):
+    """
+    Parse one uploaded workbook (raw bytes) and normalize it. Runs in a worker process.
+    Returns (filename, frame, None) on success and (filename, None, error message) on failure.
+    """
+    try:
+        df = pd.read_excel(io.BytesIO(content))
+        return filename, normalize_roster(df, filename), None
+    except Exception as e:
+        return filename, None, str(e)
+
+
+def process_files(file_buffers, max_workers=None):
+    """
+    Parse and consolidate uploaded roster workbooks, spread over a process pool
+    (workbook parsing is CPU-bound). Files keep their upload order in the result.
+    Returns (consolidated DataFrame, [(filename, error message), ...] for the files that failed).
+    """
+    uploads = [(file_buffer.name, file_buffer.getvalue()) for file_buffer in file_buffers]
+    if not uploads:
+        return pd.DataFrame(), []
+
+    max_workers = min(len(uploads), max_workers or os.cpu_count() or 1)
+    if max_workers == 1:
+        results = [read_roster(filename, content) for filename, content in uploads]
+    else:
+        # Spawned, not forked: forking the threaded Streamlit server can copy locks held by other threads
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = list(executor.map(read_roster, *zip(*uploads)))
+
+    frames = [df for _, df, error in results if error is None]
+    errors = [(filename, error) for filename, _, error in results if error is not None]
+    consolidated_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    return consolidated_df, errors
+
+
+# Download formats for the consolidated rosters: file extension and MIME type
+EXPORT_FORMATS = {
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/octet-stream"),
+}
+EXPORT_CHUNK_ROWS = 10000
+
+
+def write_excel(df, buffer):
+    """Stream df into an .xlsx in buffer with openpyxl's write-only mode, EXPORT_CHUNK_ROWS rows at a time."""
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet()
+    worksheet.append([str(col) for col in df.columns])
+    for start in range(0, len(df), EXPORT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS].astype(object)
+        for row in chunk.where(chunk.notna(), None).to_numpy().tolist():
+            worksheet.append(row)
+    workbook.save(buffer)
+
+
+def export_consolidated(df, export_format):
+    """The consolidated rosters as file bytes in one of EXPORT_FORMATS, built in memory only."""
+    buffer = io.BytesIO()
+    if export_format == "Excel":
+        write_excel(df, buffer)
+    elif export_format == "CSV":
+        df.to_csv(buffer, index=False)
+    elif export_format == "Parquet":
+        # Roster columns can mix numbers and text, which Arrow rejects
+        text_cols = df.columns[df.dtypes == object]
+        df.astype({col: "string" for col in text_cols}).to_parquet(buffer, index=False)
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
+    return buffer.getvalue()
+
+
+# Sheet appends: rows per append_rows call, and retries with exponential backoff on rate limits and server errors
+PUBLISH_CHUNK_ROWS = 500
+PUBLISH_MAX_RETRIES = 5
+PUBLISH_BACKOFF = 1.0  # seconds, doubled after every failed attempt
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+PUBLISH_KEY_COLUMNS = ["DancerID", "Source"]
+
+
+def read_sheet_keys(sheet, header):
+    """(DancerID, Source) keys of the rows below the header, as a MultiIndex of strings."""
+    existing = [sheet.col_values(header.index(col) + 1)[1:] for col in PUBLISH_KEY_COLUMNS]
+    length = max(map(len, existing))
+    return pd.MultiIndex.from_arrays([
+        ["" if value is None else str(value) for value in values] + [""] * (length - len(values))
+        for values in existing
+    ])
+
+
+def append_rows_with_retry(sheet, rows, header, max_retries=PUBLISH_MAX_RETRIES, backoff=PUBLISH_BACKOFF, sleep=time.sleep):
+    """
+    append_rows, retried with exponential backoff while the Sheets API rate-limits or fails transiently.
+    A server error does not mean the rows were not written, so before retrying after one the keys
+    are read back and the rows (in header order) that already landed are dropped.
+    """
+    positions = [header.index(col) for col in PUBLISH_KEY_COLUMNS]
+    for attempt in range(max_retries + 1):
+        if not rows:
+            return None
+        try:
+            return sheet.append_rows(rows, value_input_option="USER_ENTERED")
+        except APIError as e:
+            code = getattr(e, "code", None)
+            if attempt == max_retries or code not in RETRYABLE_STATUS_CODES:
+                raise
+            sleep(backoff * 2 ** attempt)
+            if code != 429:
+                keys = pd.MultiIndex.from_arrays([[str(row[i]) for row in rows] for i in positions])
+                landed = keys.isin(read_sheet_keys(sheet, header))
+                rows = [row for row, done in zip(rows, landed) if not done]
+
+
+def publish_rosters(df, sheet=None, chunk_size=PUBLISH_CHUNK_ROWS, sleep=time.sleep):
+    """
+    Append the consolidated rosters to the "Data" worksheet (or to sheet, any object with the
+    gspread Worksheet row_values/col_values/append_rows methods) in chunks of chunk_size rows.
+    Rows whose (DancerID, Source) is already in the sheet or earlier in df are skipped, and
+    columns are written in the sheet's header order. The local snapshot is invalidated afterwards,
+    even if an append fails part way.
+    Returns (rows appended, duplicate rows skipped).
+    """
+    if sheet is None:
+        sheet = open_worksheet()
+    header = sheet.row_values(1)
+    missing = [col for col in PUBLISH_KEY_COLUMNS if col not in header]
+    if missing:
+        raise ValueError(f"Sheet header is missing the key column(s): {', '.join(missing)}")
+
+    keys = pd.MultiIndex.from_frame(df[PUBLISH_KEY_COLUMNS].astype(str))
+    new_rows = ~keys.isin(read_sheet_keys(sheet, header)) & ~keys.duplicated()
+
+    rows = df.loc[new_rows].reindex(columns=header).astype(object)
+    rows = rows.where(rows.notna(), "").to_numpy().tolist()
+    try:
+        for start in range(0, len(rows), chunk_size):
+            append_rows_with_retry(sheet, rows[start:start + chunk_size], header, sleep=sleep)
+    finally:
+        # Also when a later chunk fails: the earlier ones are already in the sheet
+        if rows:
+            invalidate_snapshot()
+    return len(rows), int((~new_rows).sum())
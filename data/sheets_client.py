@@ -0,0 +1,36 @@
+import streamlit as st
+import gspread
+from google.oauth2.service_account import Credentials
+from config.secrets_handler import get_google_credentials
+
+SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive.file",
+    "https://www.googleapis.com/auth/drive",
+]
+SPREADSHEET_NAME = "DanceToEvolve_Data"
+WORKSHEET_NAME = "Data"
+
+
+@st.cache_resource
+def get_client():
+    """
+    The authorized gspread client, created once per process and shared by every reader and writer.
+    Its HTTP session (and open connections) are reused, and the access token is refreshed
+    by google-auth only when it expires.
+    """
+    creds = Credentials.from_service_account_info(get_google_credentials(), scopes=SCOPES)
+    return gspread.authorize(creds)
+
+
+@st.cache_resource
+def get_worksheet(spreadsheet_name=SPREADSHEET_NAME, worksheet_name=WORKSHEET_NAME):
+    """A worksheet handle on the shared client, looked up once per process."""
+    return get_client().open(spreadsheet_name).worksheet(worksheet_name)
+
+
+def reset_client():
+    """Forget the shared client and worksheet handles, e.g. after the credentials change."""
+    get_worksheet.clear()
+    get_client.clear()
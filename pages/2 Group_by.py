@@ -1,148 +1,55 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 from utils.styling import apply_global_styles
 from utils.state import init_session_state
+from utils.state import get_filtered_view
 from utils.display import metric_card
 from utils.display import plot_individual_metric
-from utils.display import apply_display_toggle
-
-def calculate_grouped_metrics(filtered_df, acquired_df, group_col):
-    grouped_df = filtered_df.groupby([group_col, 'x_axisLabel', 'Sort_Key']).agg({
-        'DancerID': 'count',
-        'Source': 'nunique'
-    }).reset_index().rename(columns={
-        'DancerID': 'Number of Dancers',
-        'Source': 'Number of Classes'
-    })
-
-    unique_dancers_df = filtered_df.groupby([group_col, 'x_axisLabel']).agg({'DancerID': 'nunique'}).reset_index()
-    unique_dancers_df.rename(columns={'DancerID': 'Number of Unique Dancers'}, inplace=True)
-
-    grouped_df = grouped_df.merge(unique_dancers_df, on=[group_col, 'x_axisLabel'], how='left')
-
-    new_students_df = acquired_df.groupby([group_col, 'x_axisLabel']).agg({'DancerID': 'nunique'}).reset_index()
-    new_students_df.rename(columns={'DancerID': 'Number of New Students'}, inplace=True)
-    st.write(new_students_df)
-
-    grouped_df = grouped_df.merge(new_students_df, on=[group_col, 'x_axisLabel'], how='left')
-    grouped_df['Number of New Students'] = grouped_df['Number of New Students'].fillna(0)
-    st.write(grouped_df)
-
-    grouped_df['Enrollment %'] = grouped_df['Number of Dancers'] / grouped_df['Number of Classes']
-    grouped_df['New Student %'] = grouped_df['Number of New Students'] / grouped_df['Number of Unique Dancers']
-    grouped_df['Retained Students'] = grouped_df['Number of Unique Dancers'] - grouped_df['Number of New Students']
-    grouped_df['Retention %'] = grouped_df['Retained Students'] / grouped_df['Number of Unique Dancers']
-
-    st.write(grouped_df)
-
-    return grouped_df
-
-def plot_grouped_metric(df, group_col, x_axis_label, metric, title, as_percentage=False):
-    df = df.sort_values("Sort_Key")
-    fig = px.line(
-        df,
-        x=x_axis_label,
-        y=metric,
-        color=group_col,
-        markers=True,
-        title=title,
-        labels={metric: title, x_axis_label: "Session"},
-        category_orders={x_axis_label: sorted(df[x_axis_label].unique(), key=lambda x: df[df[x_axis_label] == x]["Sort_Key"].iloc[0])}
-    )
-    if as_percentage:
-        fig.update_layout(yaxis_tickformat=".1%")
-    fig.update_layout(legend_title_text=group_col)
-        # Add rounded percentage labels to each point
-    for group in df[group_col].unique():
-        group_df = df[df[group_col] == group]
-        for _, row in group_df.iterrows():
-            fig.add_annotation(
-                x=row[x_axis_label],
-                y=row[metric],
-                text=f"{int(round(row[metric]*100))}%" if as_percentage else str(int(round(row[metric]))),
-                showarrow=False,
-                font=dict(color='black'),
-                xanchor='center',
-                yanchor='bottom'
-            )
-    return fig
-
+from utils.display import plot_grouped_metric
+from utils.display import render_display_toggle
+from utils.display import get_display_view
+from utils.display import get_category_order
+from utils.acquisition import get_new_students
+from utils.filters import normalize_filters
+from utils.metrics import GROUP_BY_DIMENSIONS
+from utils.metrics import compute_metrics_cube
+from utils.metrics import slice_metrics_cube
 
 def main():
     apply_global_styles()
     init_session_state()
     #st.write("Session State Snapshot:", st.session_state)
 
-    filtered_df = st.session_state['filtered_df']
+    filtered_df = get_filtered_view()
 
     st.title("🧺 Group By")
     col1, col2 = st.columns(2)
     with col1:
-        filtered_df, display_toggle = apply_display_toggle(filtered_df) 
+        display_toggle = render_display_toggle()
     with col2:
-        display_toggleVar = st.radio("GroupBy", options=["City", "Teacher", "Location", "Class", "Day","Time"], index=0)
+        display_toggleVar = st.radio("GroupBy", options=GROUP_BY_DIMENSIONS, index=0)
     group_col = display_toggleVar
 
-    if 'filtered_df' in st.session_state:
-        g_df = st.session_state['df']
-        filtered_pool = g_df.sort_values('Sort_Key')
-        last_seen = {}
-        newly_acquired = []
-
-        for _, row in filtered_pool.iterrows():
-            dancer_id = row['DancerID']
-            session_index = row['Session_Index']
-            school_year = row['School Year']
-
-            is_new = False
-            if dancer_id not in last_seen:
-                is_new = True
-            else:
-                last = last_seen[dancer_id]
-
-                if display_toggle == "All Time":
-                    # If they were never seen before = new
-                    if last is None:
-                        is_new = True
-                    else:
-                        is_new = False
-
-                elif display_toggle == "Intra Year":
-                    # Only count the first time in current year
-                    if last['school_year'] != school_year:
-                        is_new = True
-                    else:
-                        is_new = False  # already seen in current year
-
-                elif display_toggle == "Session (Consecutive)":
-                    # New if they missed at least 1 session
-                    if session_index - last['session_index'] > 1:
-                        is_new = True
-                    else:
-                        is_new = False
-
-            if is_new: #or last_seen[dancer_id]['school_year'] != school_year:
-                newly_acquired.append({
-                    group_col: row[group_col],
-                    'x_axisLabel': row['x_axisLabel'],
-                    'Sort_Key': row['Sort_Key'],
-                    'DancerID': dancer_id,
-                    'School Year String': row['School Year String']
-                })
-
-            last_seen[dancer_id] = {
-                'session_index': session_index,
-                'school_year': school_year
-            }
-
-        acquired_df = pd.DataFrame(newly_acquired)
+    if filtered_df is not None:
+        filtered_df = get_display_view(filtered_df, display_toggle)
+        acquired_df = get_new_students(
+            filtered_df, display_toggle, columns=[group_col, 'x_axisLabel', 'Sort_Key', 'DancerID', 'School Year String']
+        )
         st.write(acquired_df)
-        grouped_df = calculate_grouped_metrics(filtered_df, acquired_df, group_col)
+        # Metrics for every GroupBy option are built once per data version and filter selection;
+        # switching only slices them
+        data_version, _ = st.session_state["filtered_index"]
+        metrics_cube = compute_metrics_cube(
+            filtered_df, data_version, normalize_filters(st.session_state["selected_filters"]), display_toggle
+        )
+        grouped_df = slice_metrics_cube(metrics_cube, group_col)
+        st.write(grouped_df)
 
         total_dancers = grouped_df['Number of Dancers'].sum()
         total_unique_dancers = grouped_df['Number of Unique Dancers'].sum()
 
+        # Session order shared by every chart below
+        category_order = get_category_order(grouped_df.sort_values('Sort_Key', kind='stable'), 'x_axisLabel')
+
         #col1, col2 = st.columns(2)
         #with col1:
             #metric_card("Enrollment Ratio", f"{total_dancers / max(filtered_df['Source'].nunique(), 1):.2f}")
@@ -164,7 +71,8 @@ def main():
                 x_axis_label='x_axisLabel',
                 metric=metric,
                 title=title,
-                as_percentage=as_percentage
+                as_percentage=as_percentage,
+                category_order=category_order
             )
             st.plotly_chart(fig, use_container_width=True)
     else:
@@ -0,0 +1,51 @@
+from utils.display import get_display_view
+
+# Precomputed new-student flag for each display mode
+NEW_STUDENT_FLAGS = {
+    "All Time": "is_new_all_time",
+    "Intra Year": "is_new_intra_year",
+    "Session (Consecutive)": "is_new_consecutive",
+}
+
+
+def flag_new_students(df, display_toggle):
+    """
+    Flag the rows where a dancer counts as newly acquired, walking each dancer's
+    history in row order (df must already be sorted by Sort_Key):
+    - All Time: the first time the dancer is seen
+    - Intra Year: the first time the dancer is seen in a school year
+    - Session (Consecutive): first seen, or back after missing at least one session
+    Returns a boolean Series in df's row order.
+    """
+    dancers = df.groupby('DancerID', sort=False, dropna=False)
+
+    # Never seen before = new
+    is_new = dancers.cumcount() == 0
+
+    if display_toggle == "Intra Year":
+        is_new |= dancers['School Year'].shift() != df['School Year']
+    elif display_toggle == "Session (Consecutive)":
+        is_new |= df['Session_Index'] - dancers['Session_Index'].shift() > 1
+
+    return is_new
+
+
+def compute_acquisition_flags(df):
+    """
+    Add one is_new_* column per display mode (see NEW_STUDENT_FLAGS).
+    Whether a row is new only depends on the dancer's full history, so this runs
+    once over the master frame and pages filter on the flags.
+    """
+    df = df.copy()
+    view = get_display_view(df, "Session (Consecutive)")
+    ordered = view[['DancerID', 'School Year', 'Sort_Key', 'Session_Index']].sort_values('Sort_Key', kind='stable')
+
+    for display_toggle, flag_col in NEW_STUDENT_FLAGS.items():
+        df[flag_col] = flag_new_students(ordered, display_toggle)
+    return df
+
+
+def get_new_students(df, display_toggle, columns):
+    """Return the newly acquired rows of df for the display mode, sorted by Sort_Key."""
+    acquired = df[df[NEW_STUDENT_FLAGS[display_toggle]]]
+    return acquired.sort_values('Sort_Key')[columns].reset_index(drop=True)
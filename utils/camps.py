@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+from utils.display import get_display_view
+from utils.display import DISPLAY_OPTIONS
+from utils.filters import get_camps_filtered_df
+from utils.dancer_sets import DancerSets
+from utils.dancer_sets import dancer_codes
+
+
+def compute_new_campers(camps_df):
+    """
+    Rows where a dancer attends camp for the first time (earliest Sort_Key) and, per period,
+    the number and percentage of brand new campers among the period's unique campers.
+    Returns (new_campers_df, new_campers_summary).
+    """
+    camps_sorted = camps_df.sort_values('Sort_Key', kind='stable')
+    new_campers_df = camps_sorted.loc[~camps_sorted['DancerID'].duplicated(), [
+        'Year_Season_Session', 'School Year String', 'DancerID', 'Location', 'Teacher',
+        'Age', 'x_axisLabel', 'Sort_Key', 'School Year'
+    ]].reset_index(drop=True)
+
+    new_campers_summary = new_campers_df.groupby(['School Year String', 'x_axisLabel'], observed=True).agg(
+        **{'Number of New Campers': ('DancerID', 'nunique')}
+    ).reset_index()
+
+    total_campers = camps_df.groupby('x_axisLabel', observed=True)['DancerID'].nunique().rename('Total Unique Campers')
+    new_campers_summary = new_campers_summary.join(total_campers, on='x_axisLabel')
+    new_campers_summary['New Camper %'] = (new_campers_summary['Number of New Campers'] / new_campers_summary['Total Unique Campers']) * 100
+    return new_campers_df, new_campers_summary
+
+
+def compute_camp_enrollment(camps_df):
+    """Classes, dancer slots and dancers per class for each camp period, sorted by Sort_Key."""
+    camp_enrollment_df = camps_df.groupby(['x_axisLabel', 'Sort_Key'], observed=True).agg(**{
+        'Number of Classes': ('Source', 'nunique'),
+        'Number of Dancers': ('DancerID', 'count'),
+    }).reset_index().sort_values('Sort_Key', kind='stable')
+
+    camp_enrollment_df['Enrollment %'] = camp_enrollment_df['Number of Dancers'] / camp_enrollment_df['Number of Classes']
+    camp_enrollment_df['Enrollment %'] = camp_enrollment_df['Enrollment %'].fillna(0)
+    return camp_enrollment_df
+
+
+def _year_modes(camps_df, col, year_col):
+    """Most frequent value of col in each year (smallest first on ties), like Series.mode()[0]."""
+    counts = camps_df.groupby([year_col, col], observed=True).size().rename('n').reset_index()
+    counts = counts.sort_values([year_col, 'n'], ascending=[True, False], kind='stable')
+    return counts.drop_duplicates(year_col).set_index(year_col)[col]
+
+
+def compute_camp_retention(df, camps_df, year_col='School Year'):
+    """
+    Year-level camper overlaps from per-year dancer bitsets, in one pass over each frame:
+    - intra-year: campers of a year who also took a non-camp class that year (from the full df)
+    - year over year: campers of a year who were also campers the year before
+    Each row is labelled with the year's most frequent x_axisLabel and Sort_Key.
+    Returns (intra_year_df, year_over_year_df).
+    """
+    dancers = dancer_codes(df['DancerID'])
+    camp_sets = DancerSets(camps_df['DancerID'], camps_df[year_col], dancers)
+    non_camp_df = df[df['Season'] != 'Camp']
+    class_sets = DancerSets(non_camp_df['DancerID'], non_camp_df[year_col], dancers)
+
+    years = camp_sets.periods
+    total_unique_campers = DancerSets.counts(camp_sets.bitsets)
+    x_axis_labels = _year_modes(camps_df, 'x_axisLabel', year_col).reindex(years).to_numpy()
+    sort_keys = _year_modes(camps_df, 'Sort_Key', year_col).reindex(years).to_numpy()
+
+    appearing_earlier = DancerSets.counts(camp_sets.bitsets & class_sets.bitsets_for(years))
+    intra_year_df = pd.DataFrame({
+        'School Year': years,
+        'x_axisLabel': x_axis_labels,
+        'Sort_Key': sort_keys,
+        'Dancers Appearing Earlier': appearing_earlier,
+        'Total Unique Campers': total_unique_campers,
+        'Percentage Appearing Earlier': np.where(
+            total_unique_campers > 0, appearing_earlier / np.maximum(total_unique_campers, 1) * 100, 0
+        ),
+    })
+
+    # Every camp year after the first, against the school year before it
+    retained = DancerSets.counts(camp_sets.bitsets[1:] & camp_sets.bitsets_for(years[1:] - 1))
+    year_over_year_df = pd.DataFrame({
+        'School Year': years[1:],
+        'x_axisLabel': x_axis_labels[1:],
+        'Sort_Key': sort_keys[1:],
+        'Dancers from Y-1 in Y': retained,
+        'Total Unique Campers This Year': total_unique_campers[1:],
+        'Percentage Retained from Y-1': np.where(
+            total_unique_campers[1:] > 0, retained / np.maximum(total_unique_campers[1:], 1) * 100, 0
+        ),
+    })
+    return intra_year_df, year_over_year_df
+
+
+# One entry per display mode of the current data version
+@st.cache_data(max_entries=len(DISPLAY_OPTIONS))
+def get_camp_metrics(_df, data_version, display_toggle):
+    """
+    Every Camps page frame for the display mode, computed once per data version and shared by
+    all sessions. _df is the master frame and is not hashed: data_version identifies it.
+    Returns (new_campers_summary, camp_enrollment_df, intra_year_df, year_over_year_df).
+    """
+    df = get_display_view(_df, display_toggle)
+    camps_df = get_display_view(get_camps_filtered_df(_df, data_version), display_toggle)
+
+    _, new_campers_summary = compute_new_campers(camps_df)
+    camp_enrollment_df = compute_camp_enrollment(camps_df)
+    intra_year_df, year_over_year_df = compute_camp_retention(df, camps_df)
+    return new_campers_summary, camp_enrollment_df, intra_year_df, year_over_year_df
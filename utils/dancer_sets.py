@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+# Number of set bits in every byte value
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def dancer_codes(dancer_ids):
+    """Dense integer codes for the distinct, non-missing DancerIDs, in order of first appearance."""
+    return pd.Index(pd.unique(dancer_ids.dropna()))
+
+
+class DancerSets:
+    """
+    The set of dancers attending each period, stored as a packed bitset over dense DancerID codes.
+    Unique counts are popcounts and overlaps are bitwise ANDs of the bitsets.
+    Sets built over the same dancers index can be combined with each other.
+    """
+
+    def __init__(self, dancer_ids, periods, dancers=None):
+        self.dancers = dancer_codes(dancer_ids) if dancers is None else dancers
+        codes = self.dancers.get_indexer(dancer_ids)
+        period_codes, self.periods = pd.factorize(periods, sort=True)
+
+        attended = (codes >= 0) & (period_codes >= 0)
+        bits = np.zeros((len(self.periods), len(self.dancers)), dtype=bool)
+        bits[period_codes[attended], codes[attended]] = True
+        self.bitsets = np.packbits(bits, axis=1)
+
+    @staticmethod
+    def counts(bitsets):
+        """Number of dancers in each row of a 2-D array of bitsets."""
+        return POPCOUNT[bitsets].sum(axis=1)
+
+    def bitsets_for(self, periods):
+        """One bitset row per entry of periods; empty rows for periods nobody attended."""
+        positions = self.periods.get_indexer(periods)
+        if not len(self.periods):
+            return np.zeros((len(positions), self.bitsets.shape[1]), dtype=np.uint8)
+        rows = self.bitsets[np.maximum(positions, 0)]
+        rows[positions < 0] = 0
+        return rows
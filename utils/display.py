@@ -1,9 +1,31 @@
+import hashlib
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
 import streamlit as st
+import plotly.express as px
 import plotly.graph_objects as go
 
-def apply_display_toggle(df):
+# Master-frame columns behind x_axisLabel, Sort_Key and Session_Index in each display mode
+DISPLAY_COLUMNS = {
+    "All Time": {
+        "All Time Label": "x_axisLabel", "All Time Sort_Key": "Sort_Key", "All Time Index": "Session_Index"
+    },
+    "Intra Year": {
+        "Session Label": "x_axisLabel", "Session Sort_Key": "Sort_Key", "Session Index": "Session_Index"
+    },
+    "Session (Consecutive)": {
+        "Session Label": "x_axisLabel", "Session Sort_Key": "Sort_Key", "Session Index": "Session_Index"
+    },
+}
+DISPLAY_OPTIONS = list(DISPLAY_COLUMNS)
 
-    options = ["All Time", "Intra Year", "Session (Consecutive)"]
+def render_display_toggle():
+    """Render the Display radio and return the persisted selection."""
+    options = DISPLAY_OPTIONS
 
     # Use session state value if it exists, else default to first option
     default_option = st.session_state.get("display_toggle", options[0])
@@ -17,29 +39,105 @@ def apply_display_toggle(df):
     )
 
     # Access the persisted selection
-    toggle_value = st.session_state["display_toggle"]
+    return st.session_state["display_toggle"]
 
-    if toggle_value == "All Time":
-        df["x_axisLabel"] = df["School Year String"]
-        df["Sort_Key"] = df["School Year"]
-    else:
-        df["x_axisLabel"] = df["Year_Season_Session"]
-        df["Sort_Key"] = df["School Year"] * 100 + df["Season_Order"] * 10 + df["Session"]
 
-    df = df.sort_values("Sort_Key")
+def add_display_columns(df):
+    """
+    Precompute the label, sort key and session index of every display mode (see DISPLAY_COLUMNS).
+    Runs once per data load; the session Sort_Key becomes "Session Sort_Key".
+    """
+    df = df.copy()
+    df["All Time Label"] = df["School Year String"]
+    df["All Time Sort_Key"] = df["School Year"]
+    df["All Time Index"] = compute_session_index(df["All Time Label"], df["All Time Sort_Key"])
+
+    df["Session Label"] = df["Year_Season_Session"]
+    df["Session Sort_Key"] = df.pop("Sort_Key")
+    df["Session Index"] = compute_session_index(df["Session Label"], df["Session Sort_Key"])
+    return df
+
+
+def get_display_view(df, toggle_value):
+    """
+    Return df with the x_axisLabel, Sort_Key and Session_Index columns of the display mode.
+    The columns are precomputed by add_display_columns, so this only relabels them:
+    the data is neither copied nor sorted.
+    """
+    return df.rename(columns=DISPLAY_COLUMNS[toggle_value], copy=False)
+
 
-    # Normalize Camp 3 to Summer 2
-    df["Normalized_Label"] = df["x_axisLabel"].str.replace("Camp 3", "Summer 2")
-    session_order = {
-        label: i for i, label in enumerate(
-            sorted(df["Normalized_Label"].unique(), key=lambda x: df[df["Normalized_Label"] == x]["Sort_Key"].min())
+def apply_display_toggle(df):
+    toggle_value = render_display_toggle()
+    return get_display_view(df, toggle_value), toggle_value
+
+
+def compute_session_index(labels, sort_key):
+    """
+    Number each session label in Sort_Key order, with Camp 3 normalized to Summer 2.
+    Returns a Series aligned to labels.
+    """
+    normalized = labels.str.replace("Camp 3", "Summer 2")
+    first_key = sort_key.groupby(normalized, sort=False, dropna=False).min().sort_values(kind="stable")
+    session_order = {label: i for i, label in enumerate(first_key.index)}
+    return normalized.map(session_order)
+
+
+def get_category_order(df, x_axis_label='x_axisLabel', sort_key='Sort_Key'):
+    """
+    Return the x-axis labels of df ordered by their first Sort_Key, for Plotly category_orders.
+    One groupby pass over df; ties keep the order the labels first appear in.
+    """
+    first_key = df.groupby(x_axis_label, sort=False, observed=True)[sort_key].first()
+    return first_key.sort_values(kind="stable").index.tolist()
+
+
+# Figures built by the plot_* functions, most recently used last, shared by all sessions
+FIGURE_CACHE_SIZE = 128
+_figure_cache = OrderedDict()
+_figure_cache_lock = threading.Lock()
+
+
+def _figure_key_part(value):
+    """Hashable stand-in for a plot argument; DataFrames are reduced to a hash of their content."""
+    if isinstance(value, pd.DataFrame):
+        row_hashes = pd.util.hash_pandas_object(value, index=False).to_numpy()
+        return (tuple(value.columns), value.shape, hashlib.md5(row_hashes.tobytes()).hexdigest())
+    if isinstance(value, (list, tuple)):
+        return tuple(_figure_key_part(v) for v in value)
+    return value
+
+
+def cached_figure(plot_func):
+    """
+    Memoize a figure builder on the content of its DataFrame arguments plus its other parameters.
+    Keeps the FIGURE_CACHE_SIZE most recently used figures; callers must not modify the returned figure.
+    """
+    signature = inspect.signature(plot_func)
+
+    @functools.wraps(plot_func)
+    def wrapper(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (plot_func.__name__,) + tuple(
+            (name, _figure_key_part(value)) for name, value in bound.arguments.items()
         )
-    }
-    df["Session_Index"] = df["Normalized_Label"].map(session_order)
 
-    st.session_state['df'] = df
+        with _figure_cache_lock:
+            if key in _figure_cache:
+                _figure_cache.move_to_end(key)
+                return _figure_cache[key]
 
-    return df, toggle_value
+        fig = plot_func(*args, **kwargs)
+
+        with _figure_cache_lock:
+            _figure_cache[key] = fig
+            _figure_cache.move_to_end(key)
+            while len(_figure_cache) > FIGURE_CACHE_SIZE:
+                _figure_cache.popitem(last=False)
+        return fig
+
+    return wrapper
 
 
 def metric_card(title, value, suffix="", title_color="#A8B2FF", value_color="#000000", background_color="#f5f5f5"):
@@ -58,6 +156,7 @@ def metric_card(title, value, suffix="", title_color="#A8B2FF", value_color="#00
         </div>
     """, unsafe_allow_html=True)
 
+@cached_figure
 def plot_individual_metric(df, x_axis_label='x_axisLabel', metric='Number of Dancers', 
                          base_metric_df=None, base_metric=None, title=None, 
                          as_percentage=False, trace_color='pink'):
@@ -110,19 +209,20 @@ def plot_individual_metric(df, x_axis_label='x_axisLabel', metric='Number of Dan
         )
     )
     
-    # Add annotations to each point
-    for _, row in df.iterrows():
-        fig.add_annotation(
-            x=row[x_axis_label],
-            y=row[metric], #if not as_percentage else (row[metric] / base_metric_df[base_metric_df[x_axis_label] == row[x_axis_label]][base_metric].iloc[0] * 100) if as_percentage else 0,
-            #text=str(round(row[metric], 1)) if not as_percentage else f"{round((row[metric] / base_metric_df[base_metric_df[x_axis_label] == row[x_axis_label]][base_metric].iloc[0] * 100), 1)}%",
-            text = f"{int(round(row[metric]))}%" if as_percentage else str(round(row[metric])),
+    # Label each point; all annotations are assigned in one layout update below
+    annotations = [
+        dict(
+            x=x,
+            y=y,
+            text = f"{int(round(y))}%" if as_percentage else str(round(y)),
             showarrow=False,
             xanchor='left',
             yanchor='middle',
             xshift=10,
             font=dict(color='black', weight='bold')
         )
+        for x, y in zip(df[x_axis_label].tolist(), df[metric].tolist())
+    ]
     
     # Set title if not provided
     if title is None:
@@ -141,7 +241,45 @@ def plot_individual_metric(df, x_axis_label='x_axisLabel', metric='Number of Dan
         yaxis=dict(showgrid=True, zeroline=False, showline=True, linewidth=2, linecolor='lightgrey'),
         plot_bgcolor='rgba(0,0,0,0)',
         hovermode='x unified',
-        title = title
+        title = title,
+        annotations=annotations
     )
     
     return fig
+
+
+@cached_figure
+def plot_grouped_metric(df, group_col, x_axis_label, metric, title, as_percentage=False, category_order=None):
+    df = df.sort_values("Sort_Key")
+    if category_order is None:
+        category_order = get_category_order(df, x_axis_label)
+    fig = px.line(
+        df,
+        x=x_axis_label,
+        y=metric,
+        color=group_col,
+        markers=True,
+        title=title,
+        labels={metric: title, x_axis_label: "Session"},
+        category_orders={x_axis_label: category_order}
+    )
+    if as_percentage:
+        fig.update_layout(yaxis_tickformat=".1%")
+    fig.update_layout(legend_title_text=group_col)
+    # Add rounded percentage labels to each point, group by group, in one layout update
+    group_codes, _ = pd.factorize(df[group_col])
+    labelled = df.iloc[np.argsort(group_codes, kind='stable')]
+    labelled = labelled[labelled[group_col].notna()]
+    fig.update_layout(annotations=[
+        dict(
+            x=x,
+            y=y,
+            text=f"{int(round(y*100))}%" if as_percentage else str(int(round(y))),
+            showarrow=False,
+            font=dict(color='black'),
+            xanchor='center',
+            yanchor='bottom'
+        )
+        for x, y in zip(labelled[x_axis_label].tolist(), labelled[metric].tolist())
+    ])
+    return fig
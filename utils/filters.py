@@ -53,31 +53,79 @@ def select_all_option_expander(label, options, sort_order=None):
     return st.session_state[key]
 
 
-@st.cache_data
-def get_filtered_df(df, selected_filters: dict):
-    """Filter DataFrame based on selected filters."""
-    filtered = df[
-        (df['Class'].isin(selected_filters['classes'])) &
-        (df['Location'].isin(selected_filters['locations'])) &
-        (df['Teacher'].isin(selected_filters['teachers'])) &
-        (df['Age'].isin(selected_filters['ages'])) &
-        (df['Reg/NonReg'].isin(selected_filters['reg_nonreg'])) &
-        (df['School Year'].isin(selected_filters['school_years'])) &
-        (df['Season'].isin(selected_filters['seasons'])) &
-        (df['City'].isin(selected_filters['cities'])) &
-        (df['Day'].isin(selected_filters['days'])) &
-        (df['Time'].isin(selected_filters['times'])) &
-        (df['Session'].isin(selected_filters['sessions']))
-    ]
+# Filter selections whose row index is kept, across all sessions and data versions
+FILTERED_INDEX_CACHE_SIZE = 64
+
+# Filter key in selected_filters -> DataFrame column
+FILTER_COLUMNS = {
+    'school_years': 'School Year',
+    'seasons': 'Season',
+    'sessions': 'Session',
+    'cities': 'City',
+    'locations': 'Location',
+    'reg_nonreg': 'Reg/NonReg',
+    'classes': 'Class',
+    'ages': 'Age',
+    'teachers': 'Teacher',
+    'days': 'Day',
+    'times': 'Time',
+}
+
+
+class FilterIndex:
+    """
+    Row bitmaps (NumPy bool arrays) for every value of every filter column.
+    A column's selection is the OR of its selected values' bitmaps, and the
+    columns are ANDed together, so filtering never rescans the DataFrame.
+    """
+
+    def __init__(self, df):
+        self.index = df.index
+        self.bitmaps = {}
+        for col in FILTER_COLUMNS.values():
+            codes, values = pd.factorize(df[col], use_na_sentinel=False)
+            self.bitmaps[col] = {value: codes == i for i, value in enumerate(values)}
+
+    def mask(self, col, selected, within=None):
+        """Rows whose col value is in selected, restricted to the rows in within if given."""
+        mask = np.zeros(len(self.index), dtype=bool)
+        bitmaps = self.bitmaps[col]
+        for value in selected:
+            if value in bitmaps:
+                mask |= bitmaps[value]
+        return mask if within is None else mask & within
+
+    def options(self, col, within=None):
+        """Values of col that occur in the rows in within (all rows if None)."""
+        bitmaps = self.bitmaps[col]
+        if within is None:
+            return list(bitmaps)
+        return [value for value, bitmap in bitmaps.items() if np.count_nonzero(bitmap & within)]
+
+    def rows(self, selected_filters):
+        """Index labels of the rows matching every selected filter."""
+        mask = np.ones(len(self.index), dtype=bool)
+        for key, col in FILTER_COLUMNS.items():
+            mask = self.mask(col, selected_filters[key], within=mask)
+        return self.index[mask]
+
+
+def normalize_filters(selected_filters):
+    """Filter selections as a hashable cache key: (key, sorted values) pairs in FILTER_COLUMNS order."""
+    return tuple((key, tuple(sorted(selected_filters[key], key=str))) for key in FILTER_COLUMNS)
+
+@st.cache_data(max_entries=FILTERED_INDEX_CACHE_SIZE)
+def get_filtered_index(_filter_index, data_version, selected_filters):
+    """Index labels of the rows matching the selected filters (see normalize_filters), cached per data version."""
+    return _filter_index.rows(dict(selected_filters))
+
+@st.cache_data(max_entries=1)
+def get_camps_filtered_df(_df, data_version):
+    """Filter DataFrame for camps, cached per data version instead of hashing the frame."""
+    filtered = _df[_df['Season'] == 'Camp']
     return filtered
 
-@st.cache_data
-def get_camps_filtered_df(df):
-    """Filter DataFrame for camps."""
-    filtered = df[df['Season'] == 'Camp']
-    return filtered
-
-def render_persistent_filters(df):
+def render_persistent_filters(filter_index):
     """Render filters with persistent session state across pages."""
     if "select_all_filters" not in st.session_state:
         st.session_state.select_all_filters = False
@@ -88,30 +136,30 @@ def render_persistent_filters(df):
     with col1:
         sf["school_years"] = select_all_option_expander(
             'School Year',
-            df["School Year"].unique(),
+            filter_index.options("School Year"),
             sort_order='numerical'
         )
 
-    # Filter df by School Year before next
-    df = df[df["School Year"].isin(sf["school_years"])]
+    # Restrict the rows by School Year before next
+    rows = filter_index.mask("School Year", sf["school_years"])
 
     with col2:
         sf["seasons"] = select_all_option_expander(
             'Season',
-            df["Season"].unique(),
+            filter_index.options("Season", rows),
             sort_order='alphabetical'
         )
 
-    df = df[df["Season"].isin(sf["seasons"])]
+    rows = filter_index.mask("Season", sf["seasons"], rows)
 
     with col3:
         sf["sessions"] = select_all_option_expander(
             'Session',
-            df["Session"].unique(),
+            filter_index.options("Session", rows),
             sort_order='numerical'
         )
 
-    df = df[df["Session"].isin(sf["sessions"])]
+    rows = filter_index.mask("Session", sf["sessions"], rows)
 
     # --- Additional Filters ---
     st.markdown("<h5 style='text-align: left;'>Additional Filters</h5>", unsafe_allow_html=True)
@@ -120,71 +168,70 @@ def render_persistent_filters(df):
     with col1:
         sf["cities"] = select_all_option_expander(
             'City',
-            df["City"].unique(),
+            filter_index.options("City", rows),
             sort_order='alphabetical'
         )
 
-    df = df[df["City"].isin(sf["cities"])]
+    rows = filter_index.mask("City", sf["cities"], rows)
 
     with col2:
         sf["locations"] = select_all_option_expander(
             'Location',
-            df["Location"].unique(),
+            filter_index.options("Location", rows),
             sort_order='alphabetical'
         )
 
-    df = df[df["Location"].isin(sf["locations"])]
+    rows = filter_index.mask("Location", sf["locations"], rows)
 
     with col3:
         sf["reg_nonreg"] = select_all_option_expander(
             'Reg/NonReg',
-            df["Reg/NonReg"].unique(),
+            filter_index.options("Reg/NonReg", rows),
             sort_order='alphabetical'
         )
 
-    df = df[df["Reg/NonReg"].isin(sf["reg_nonreg"])]
+    rows = filter_index.mask("Reg/NonReg", sf["reg_nonreg"], rows)
 
     col_class, = st.columns(1)
     with col_class:
         sf["classes"] = select_all_option_expander(
             'Class',
-            df["Class"].unique(),
+            filter_index.options("Class", rows),
             sort_order='alphabetical'
         )
 
-    df = df[df["Class"].isin(sf["classes"])]
+    rows = filter_index.mask("Class", sf["classes"], rows)
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         sf["ages"] = select_all_option_expander(
             'Age',
-            df["Age"].unique(),
+            filter_index.options("Age", rows),
             sort_order='numerical'
         )
-    df = df[df["Age"].isin(sf["ages"])]
+    rows = filter_index.mask("Age", sf["ages"], rows)
 
     with col2:
         sf["teachers"] = select_all_option_expander(
             'Teacher',
-            df["Teacher"].unique(),
+            filter_index.options("Teacher", rows),
             sort_order='alphabetical'
         )
-    df = df[df["Teacher"].isin(sf["teachers"])]
+    rows = filter_index.mask("Teacher", sf["teachers"], rows)
 
     with col3:
         sf["days"] = select_all_option_expander(
             'Day',
-            df["Day"].unique(),
+            filter_index.options("Day", rows),
             sort_order='alphabetical'
         )
-    df = df[df["Day"].isin(sf["days"])]
+    rows = filter_index.mask("Day", sf["days"], rows)
 
     with col4:
         sf["times"] = select_all_option_expander(
             'Time',
-            df["Time"].unique(),
+            filter_index.options("Time", rows),
             sort_order='alphabetical'
         )
-    df = df[df["Time"].isin(sf["times"])]
 
     return sf
@@ -1,93 +1,109 @@
+import logging
+import numpy as np
 import pandas as pd
-import streamlit as st
-from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# School year offset from the calendar Year for each (Season, Session):
+# Fall belongs to the school year starting that Year, the rest to the one starting the Year before
+SCHOOL_YEAR_OFFSETS = {
+    ('Fall', 1): 0, ('Fall', 2): 0,
+    ('Winter', 1): 1, ('Winter', 2): 1,
+    ('Spring', 1): 1, ('Spring', 2): 1,
+    ('Summer', 1): 1, ('Summer', 2): 1, ('Camp', 3): 1
+}
 
 def compute_school_year(df):
     df = df.copy()
-    school_year_order = [
-        ('Fall', 1), ('Fall', 2), 
-        ('Winter', 1), ('Winter', 2),
-        ('Spring', 1), ('Spring', 2), 
-        ('Summer', 1), ('Summer', 2), ('Camp', 3)
-    ]
-    school_year_mapping = {}
-    school_year_string_mapping = {}
-
     df['Year'] = pd.to_numeric(df['Year'], errors='coerce')
-    years = sorted(df['Year'].dropna().astype(int).unique())
-
-    for year_start in years:
-        start_periods = [
-            (year_start, 'Fall', 1), (year_start, 'Fall', 2),
-            (year_start + 1, 'Winter', 1), (year_start + 1, 'Winter', 2),
-            (year_start + 1, 'Spring', 1), (year_start + 1, 'Spring', 2),
-            (year_start + 1, 'Summer', 1), (year_start + 1, 'Summer', 2),
-            (year_start + 1, 'Camp', 3),
-        ]
-        school_year_str = f"{year_start}-{year_start - 1999}"
-        for period in start_periods:
-            school_year_mapping[period] = year_start
-            school_year_string_mapping[period] = school_year_str
-
-        # Override for Summer 2022 → School Year 2021
-        override_periods = [
-            ('Summer', 1), ('Summer', 2)
-        ]
-        for season, session in override_periods:
-            school_year_mapping[(2022, season, session)] = 2021
-            school_year_string_mapping[(2022, season, session)] = f"2021-{2021 - 1999}"
-
-    df['School Year'] = df.apply(lambda row: school_year_mapping.get((row['Year'], row['Season'], row['Session'])), axis=1)
-    df['School Year String'] = df.apply(lambda row: school_year_string_mapping.get((row['Year'], row['Season'], row['Session'])), axis=1)
+    years = df['Year'].dropna().astype(int).unique()
+
+    offset = pd.Series(np.nan, index=df.index)
+    for (season, session), period_offset in SCHOOL_YEAR_OFFSETS.items():
+        offset[(df['Season'] == season) & (df['Session'] == session)] = period_offset
+
+    school_year = df['Year'] - offset
+    # Only school years starting in a Year present in the data are defined
+    school_year = school_year.where(school_year.isin(years))
+
+    # Override for Summer 2022 → School Year 2021
+    summer_2022 = (df['Year'] == 2022) & (df['Season'] == 'Summer') & df['Session'].isin([1, 2])
+    school_year[summer_2022] = 2021
+
+    valid = school_year.notna()
+    start_year = school_year[valid].astype(int)
+    school_year_string = pd.Series(None, index=df.index, dtype=object)
+    school_year_string[valid] = start_year.astype(str) + '-' + (start_year - 1999).astype(str)
+
+    df['School Year'] = school_year
+    df['School Year String'] = school_year_string
     return df
 
-# Cached school year logic
-@st.cache_data
-def school_year(df):
-    return compute_school_year(df)
-
-@st.cache_data
-def calculate_age(df):
-    # Define season/session start dates
-    season_session_starts = {
-        ('Fall', 1): (9, 1),    # September 1
-        ('Fall', 2): (11, 1),   # November 1
-        ('Winter', 1): (1, 1),  # January 1
-        ('Winter', 2): (2, 1),  # February 1
-        ('Spring', 1): (4, 1),  # April 1
-        ('Spring', 2): (5, 1),  # May 1
-        ('Summer', 1): (6, 1),  # June 1
-        ('Camp', 3): (6,1),     # June 1
-        ('Summer', 2): (7, 1)   # July 1
-    }
-
-    def compute_age(row):
-        try:
-            # Parse BirthDate (e.g., "Jan 01, 2000")
-            birth_date = datetime.strptime(row['BirthDate'], '%m/%d/%Y')
-            year = row['Year']
-            season = row['Season']
-            session = row['Session']
-            
-            # Get month and day for the season/session
-            if pd.isna(year) or pd.isna(season) or pd.isna(session):
-                return None
-            month, day = season_session_starts.get((season, int(session)), (1, 1))  # Default to Jan 1 if invalid
-            
-            # Create event date (start of season/session in Year)
-            event_date = datetime(int(year), month, day)
-            
-            # Calculate age in years as a float
-            age = (event_date - birth_date).days / 365.25  # Approximate years, accounting for leap years
-
-            # Round to nearest 0.5
-            age_rounded = round(age * 2) / 2
-            
-            return age_rounded if age_rounded >= 0 else None
-        except (ValueError, TypeError, KeyError):
-            return None
+# Season/session start dates (month, day); anything else defaults to January 1
+SEASON_SESSION_STARTS = {
+    ('Fall', 1): (9, 1),    # September 1
+    ('Fall', 2): (11, 1),   # November 1
+    ('Winter', 1): (1, 1),  # January 1
+    ('Winter', 2): (2, 1),  # February 1
+    ('Spring', 1): (4, 1),  # April 1
+    ('Spring', 2): (5, 1),  # May 1
+    ('Summer', 1): (6, 1),  # June 1
+    ('Camp', 3): (6,1),     # June 1
+    ('Summer', 2): (7, 1)   # July 1
+}
+
+def compute_age(df):
+    # Parse BirthDate (e.g., "01/31/2000") in one pass; unparseable or non-string values become NaT
+    birth_date = pd.to_datetime(df['BirthDate'].astype(str), format='%m/%d/%Y', errors='coerce')
+
+    year = pd.to_numeric(df['Year'], errors='coerce')
+    session = pd.to_numeric(df['Session'], errors='coerce')
+
+    # Get month and day for the season/session
+    month = pd.Series(1, index=df.index)
+    day = pd.Series(1, index=df.index)
+    for (season, session_number), (start_month, start_day) in SEASON_SESSION_STARTS.items():
+        period = (df['Season'] == season) & (session == session_number)
+        month[period] = start_month
+        day[period] = start_day
+
+    # Create event date (start of season/session in Year); missing Year, Season or Session gives NaT
+    event_date = pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': day}), errors='coerce')
+    event_date[df['Season'].isna() | session.isna()] = pd.NaT
+
+    # Calculate age in years, accounting for leap years, rounded to the nearest 0.5
+    age = (event_date - birth_date).dt.days / 365.25
+    age_rounded = np.round(age * 2) / 2
 
     # Create or overwrite Age column
-    df['Age'] = df.apply(compute_age, axis=1)
+    df['Age'] = age_rounded.where(age_rounded >= 0)
     return df
 
+
+# Low-cardinality text columns stored as pandas categoricals
+CATEGORICAL_COLUMNS = [
+    'Class', 'Location', 'Teacher', 'City', 'Season', 'Day', 'Time', 'Reg/NonReg', 'Source',
+    'School Year String', 'Year_Season_Session', 'All Time Label', 'Session Label'
+]
+# Integer columns downcast to the smallest integer type that holds them
+INTEGER_COLUMNS = [
+    'Year', 'Session', 'School Year', 'Season_Order',
+    'All Time Sort_Key', 'All Time Index', 'Session Sort_Key', 'Session Index'
+]
+
+def compact_dtypes(df):
+    """Convert the master frame to a compact representation and log its memory before and after."""
+    memory_before = df.memory_usage(deep=True).sum()
+
+    df = df.copy()
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in INTEGER_COLUMNS:
+        # Year stays float when some rows have no valid year
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+
+    memory_after = df.memory_usage(deep=True).sum()
+    logger.info("Master frame memory: %.1f MB -> %.1f MB", memory_before / 1e6, memory_after / 1e6)
+    return df
@@ -0,0 +1,68 @@
+import pandas as pd
+import streamlit as st
+from utils.acquisition import NEW_STUDENT_FLAGS
+
+# Columns the Group By page can break metrics down by
+GROUP_BY_DIMENSIONS = ["City", "Teacher", "Location", "Class", "Day", "Time"]
+
+# (data version, filter selection, display mode) combinations whose metrics cube is kept
+METRICS_CUBE_CACHE_SIZE = 32
+
+
+def compute_period_metrics(df, display_toggle, group_cols=()):
+    """
+    All per-period measures of df in one grouped aggregation, one row per
+    (group_cols..., x_axisLabel, Sort_Key), sorted by Sort_Key:
+    - Number of Dancers: dancer slots (rows)
+    - Number of Unique Dancers: distinct DancerIDs
+    - Number of Classes: distinct Sources
+    - Number of New Students: distinct DancerIDs newly acquired in the display mode
+    - Retained Students: unique dancers who are not new
+    - Enrollment %: dancer slots per class
+    - New Student % / Retention %: share of unique dancers (0-1)
+    df must already carry the display mode's x_axisLabel and Sort_Key columns.
+    """
+    keys = list(group_cols) + ['x_axisLabel', 'Sort_Key']
+    flag_col = NEW_STUDENT_FLAGS[display_toggle]
+
+    period_df = df[keys + ['DancerID', 'Source']].assign(NewDancerID=df['DancerID'].where(df[flag_col]))
+    metrics = period_df.groupby(keys, observed=True).agg(**{
+        'Number of Dancers': ('DancerID', 'count'),
+        'Number of Unique Dancers': ('DancerID', 'nunique'),
+        'Number of Classes': ('Source', 'nunique'),
+        'Number of New Students': ('NewDancerID', 'nunique'),
+    }).reset_index()
+
+    metrics['Retained Students'] = metrics['Number of Unique Dancers'] - metrics['Number of New Students']
+    metrics['Enrollment %'] = metrics['Number of Dancers'] / metrics['Number of Classes']
+    metrics['New Student %'] = metrics['Number of New Students'] / metrics['Number of Unique Dancers']
+    metrics['Retention %'] = metrics['Retained Students'] / metrics['Number of Unique Dancers']
+
+    return metrics.sort_values('Sort_Key', kind='stable').reset_index(drop=True)
+
+
+@st.cache_data(max_entries=METRICS_CUBE_CACHE_SIZE)
+def compute_metrics_cube(_df, data_version, selected_filters, display_toggle, dimensions=tuple(GROUP_BY_DIMENSIONS)):
+    """
+    Period metrics (see compute_period_metrics) broken down by each of dimensions,
+    stacked into one frame with a Dimension column naming the breakdown and a Group
+    column holding its value. _df is the filtered display view and is not hashed:
+    data_version, the selected filters (see normalize_filters) and display_toggle identify it.
+    """
+    return pd.concat([
+        compute_period_metrics(_df, display_toggle, group_cols=[dimension])
+        .rename(columns={dimension: 'Group'})
+        .astype({'Group': object})
+        .assign(Dimension=dimension)
+        for dimension in dimensions
+    ], ignore_index=True)
+
+
+def slice_metrics_cube(cube, dimension):
+    """
+    The rows of the cube for one dimension, with Group renamed back to the dimension's column,
+    ordered by group and then period.
+    """
+    grouped_df = cube[cube['Dimension'] == dimension].drop(columns='Dimension')
+    grouped_df = grouped_df.rename(columns={'Group': dimension})
+    return grouped_df.sort_values([dimension, 'x_axisLabel', 'Sort_Key']).reset_index(drop=True)
@@ -1,4 +1,8 @@
 import streamlit as st
+from data.master import get_master
+from data.master import get_filter_index
+from utils.filters import normalize_filters
+from utils.filters import get_filtered_index
 
 def init_session_state():
     #if "display_toggle" not in st.session_state:
@@ -7,8 +11,9 @@ def init_session_state():
     default_keys = {
         "reset_filters": False,
         "select_all_filters": False,
-        "df": None,
-        "filtered_df": None
+        "filtered_index": None,
+        "consolidated_df": None,
+        "export_data": {}
     }
 
     for key, val in default_keys.items():
@@ -19,3 +24,19 @@ def init_session_state():
     if "selected_filters" not in st.session_state:
         st.session_state["selected_filters"] = {}
 
+
+def get_filtered_view():
+    """
+    Rows of the shared master frame selected on the main page, or None before filters are applied.
+    The index is stored as (data version, index); if the master frame was reloaded since, the
+    selection is re-applied to the new data.
+    """
+    filtered_index = st.session_state.get("filtered_index")
+    if filtered_index is None:
+        return None
+    df, data_version = get_master()
+    index_version, index = filtered_index
+    if index_version != data_version:
+        index = get_filtered_index(get_filter_index(), data_version, normalize_filters(st.session_state["selected_filters"]))
+        st.session_state["filtered_index"] = (data_version, index)
+    return df.loc[index]